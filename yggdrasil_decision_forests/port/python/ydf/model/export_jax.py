@@ -19,7 +19,7 @@ import dataclasses
 import enum
 import functools
 import math
-from typing import Any, Sequence, Dict, Optional, List, Set, Tuple, Callable, Union, MutableSequence
+from typing import Any, Sequence, Dict, Optional, List, NamedTuple, Set, Tuple, Callable, Union, MutableSequence
 
 import numpy as np
 
@@ -44,12 +44,23 @@ except ImportError as exc:
 # Typehint for arrays
 ArrayFloat = MutableSequence[float]
 ArrayInt = MutableSequence[int]
-ArrayBool = MutableSequence[int]
+
+# Evaluates the condition of a non-leaf node index for each tree, given the
+# internal feature values.
+ConditionFn = Callable[[jax.Array, "InternalFeatureValues"], jax.Array]
 
 # Names of the learnable parameters of the model.
 _PARAM_LEAF_VALUES = "leaf_values"
 _PARAM_INITIAL_PREDICTIONS = "initial_predictions"
 
+# Default candidates of "compact_dtype" with their (min, max) range of values.
+# Computed once since "compact_dtype" is called for each exported array.
+_INT_RANGES = [
+    (jnp.int8, -(2**7), 2**7 - 1),
+    (jnp.int16, -(2**15), 2**15 - 1),
+    (jnp.int32, -(2**31), 2**31 - 1),
+]
+
 
 # Index of the type of conditions in the intermediate tree representation.
 class ConditionType(enum.IntEnum):
@@ -88,31 +99,46 @@ def compact_dtype(
     First dtype in "supported_dtypes" compatible with "values".
   """
 
-  if not values:
+  if len(values) == 0:  # pylint: disable=g-explicit-length-test
     raise ValueError("No values provided")
 
-  min_value = min(values)
-  max_value = max(values)
+  min_value = np.min(values)
+  max_value = np.max(values)
 
   if supported_dtypes is None:
-    supported_dtypes = [jnp.int8, jnp.int16, jnp.int32]
-
-  for candidate in supported_dtypes:
-    info = jnp.iinfo(candidate)
-    if min_value >= info.min and max_value <= info.max:
-      return candidate
-  raise ValueError("No supported compact dtype")
+    int_ranges = _INT_RANGES
+  else:
+    int_ranges = _int_ranges(supported_dtypes)
+  return _select_compact_dtype(min_value, max_value, int_ranges)
 
 
 def compact_dtype_on_sequence_sequence(values: Sequence[Sequence[int]]) -> Any:
   """Same as "compact_dtype", but operate on sequence of sequences."""
 
-  min_value = min(min(v) for v in values)
-  max_value = max(max(v) for v in values)
+  min_value = min(np.min(v) for v in values)
+  max_value = max(np.max(v) for v in values)
+  return _select_compact_dtype(min_value, max_value, _INT_RANGES)
 
-  for candidate in [jnp.int8, jnp.int16, jnp.int32]:
-    info = jnp.iinfo(candidate)
-    if min_value >= info.min and max_value <= info.max:
+
+def _int_ranges(dtypes: Sequence[Any]) -> List[Tuple[Any, int, int]]:
+  """Lists the (dtype, min value, max value) of integer dtypes."""
+
+  ranges = []
+  for dtype in dtypes:
+    info = jnp.iinfo(dtype)
+    ranges.append((dtype, int(info.min), int(info.max)))
+  return ranges
+
+
+def _select_compact_dtype(
+    min_value: int,
+    max_value: int,
+    int_ranges: Sequence[Tuple[Any, int, int]],
+) -> Any:
+  """Selects the first dtype whose range contains [min_value, max_value]."""
+
+  for candidate, candidate_min, candidate_max in int_ranges:
+    if min_value >= candidate_min and max_value <= candidate_max:
       return candidate
   raise ValueError("No supported compact dtype")
 
@@ -120,12 +146,43 @@ def compact_dtype_on_sequence_sequence(values: Sequence[Sequence[int]]) -> Any:
 def to_compact_jax_array(values: Sequence[int]) -> jax.Array:
   """Converts a list of integers to a compact Jax array."""
 
-  if not values:
+  return jnp.asarray(_to_compact_numpy_array(values))
+
+
+def _to_compact_numpy_array(values: Sequence[int]) -> np.ndarray:
+  """Converts a list of integers to a compact NumPy array."""
+
+  if len(values) == 0:  # pylint: disable=g-explicit-length-test
     # Note: Because of the way Jax handle virtual out of bound access in vmap,
     # it is important for arrayes to never be empty.
-    return jnp.asarray([0], dtype=jnp.int32)
+    return np.asarray([0], dtype=jnp.int32)
+
+  return np.asarray(values, dtype=compact_dtype(values))
+
+
+@dataclasses.dataclass(frozen=True)
+class _CategoricalVocabulary:
+  """Sorted vocabulary of a categorical-string feature.
+
+  Used to encode arrays of strings with a binary search instead of a dictionary
+  lookup per value.
+
+  Attributes:
+    keys: Sorted categorical-string values.
+    values: Categorical-integer value of each of the "keys".
+  """
+
+  keys: np.ndarray
+  values: np.ndarray
 
-  return jnp.asarray(values, dtype=compact_dtype(values))
+  @classmethod
+  def build(cls, categorical_map: Dict[str, int]) -> "_CategoricalVocabulary":
+    """Creates a vocabulary from a categorical-string to integer mapping."""
+    keys = sorted(categorical_map)
+    return _CategoricalVocabulary(
+        keys=np.array(keys, dtype=np.str_),
+        values=np.array([categorical_map[k] for k in keys], dtype=np.int32),
+    )
 
 
 @dataclasses.dataclass
@@ -139,7 +196,9 @@ class FeatureEncoder:
 
   Attributes:
     categorical: Mapping between categorical-string feature to the dictionary of
-      categorical-string value to categorical-integer value.
+      categorical-string value to categorical-integer value. The dictionary of
+      a feature should not be modified in place after the first encoding.
+      Instead, replace it (or "categorical") with a new dictionary.
     categorical_out_of_vocab_item: Integer value representing an out of
       vocabulary item.
     categorical_missing_value: How to represent a missing categorical value.
@@ -148,6 +207,13 @@ class FeatureEncoder:
   categorical: Dict[str, Dict[str, int]]
   categorical_out_of_vocab_item: int = 0
   categorical_missing_value: int = -1
+  # Sorted vocabulary of each categorical-string feature, built on first use,
+  # and the "categorical" dictionary it was built from.
+  _vocabularies: Dict[
+      str, Tuple[Dict[str, int], _CategoricalVocabulary]
+  ] = dataclasses.field(
+      default_factory=dict, init=False, repr=False, compare=False
+  )
 
   @classmethod
   def build(
@@ -199,22 +265,85 @@ class FeatureEncoder:
       Jax model.
     """
 
-    def encode_feature(name: str, values: Any) -> jax.Array:
-      """Encodes the values of a feature."""
+    def encode_feature(name: str, values: Any) -> Any:
+      """Encodes the values of a feature on the host."""
       categorical_map = self.categorical.get(name)
 
-      if categorical_map is not None:
-        values = [
-            self._encode_categorical_string_value(categorical_map, name, v)
-            for v in values
-        ]
+      if (
+          categorical_map is not None
+          and isinstance(values, np.ndarray)
+          and values.ndim == 1
+          and values.dtype.kind in ("U", "S")
+      ):
+        values = self._encode_categorical_string_array(
+            self._vocabulary(name, categorical_map), values
+        )
+      elif categorical_map is not None:
+        values = np.fromiter(
+            (
+                self._encode_categorical_string_value(categorical_map, name, v)
+                for v in values
+            ),
+            dtype=np.int32,
+            count=len(values),
+        )
 
-      return jax.numpy.asarray(values)
+      return values
 
-    return {
-        name: encode_feature(name, values)
-        for name, values in feature_values.items()
-    }
+    # NumPy arrays are transferred to the device all at once.
+    host_arrays: Dict[str, np.ndarray] = {}
+    encoded_features: Dict[str, jax.Array] = {}
+    for name, values in feature_values.items():
+      values = encode_feature(name, values)
+      if isinstance(values, np.ndarray):
+        host_arrays[name] = values
+      else:
+        encoded_features[name] = jax.numpy.asarray(values)
+    encoded_features.update(jax.device_put(host_arrays))
+    return {name: encoded_features[name] for name in feature_values}
+
+  def _vocabulary(
+      self, name: str, categorical_map: Dict[str, int]
+  ) -> _CategoricalVocabulary:
+    """Gets the sorted vocabulary of a feature from its categorical mapping.
+
+    The vocabulary is cached, and rebuilt if the mapping of the feature was
+    replaced since.
+
+    Args:
+      name: Name of the feature.
+      categorical_map: Current categorical mapping of the feature.
+
+    Returns:
+      The sorted vocabulary.
+    """
+    cached = self._vocabularies.get(name)
+    if cached is None or cached[0] is not categorical_map:
+      cached = (categorical_map, _CategoricalVocabulary.build(categorical_map))
+      self._vocabularies[name] = cached
+    return cached[1]
+
+  def _encode_categorical_string_array(
+      self, vocabulary: _CategoricalVocabulary, values: np.ndarray
+  ) -> np.ndarray:
+    """Encodes a NumPy array of str or bytes into integers."""
+    if values.dtype.kind == "S":
+      values = np.char.decode(values, "utf-8")
+    if vocabulary.keys.size == 0:
+      encoded = np.full(
+          values.shape, self.categorical_out_of_vocab_item, dtype=np.int32
+      )
+    else:
+      key_idxs = np.minimum(
+          np.searchsorted(vocabulary.keys, values), vocabulary.keys.size - 1
+      )
+      encoded = np.where(
+          vocabulary.keys[key_idxs] == values,
+          vocabulary.values[key_idxs],
+          np.int32(self.categorical_out_of_vocab_item),
+      )
+    encoded[values == ""] = self.categorical_missing_value
+    return encoded
 
   def _normalize_categorical_string_value(self, name: str, value: Any) -> str:
     """Normalizes a categorical string value into a str."""
@@ -269,12 +398,13 @@ class JaxModel:
   params: Optional[Dict[str, Any]]
 
 
-@dataclasses.dataclass
-class InternalFeatureValues:
+class InternalFeatureValues(NamedTuple):
   """Internal representation of feature values.
 
   In the internal model format, features with the same semantic are grouped
   together i.e. densified.
+
+  Note: As a NamedTuple, this is natively a JAX pytree.
   """
 
   numerical: jax.Array
@@ -417,14 +547,15 @@ class InternalFeatureSpec:
       if not features:
         return jnp.zeros(shape=[batch_size, 0], dtype=dtype)
 
-      return jnp.concatenate(
-          [
-              normalize_feature(feature_values[feature.name], feature)
-              for feature in features
-          ],
-          dtype=dtype,
-          axis=1,
-      )
+      columns = [
+          normalize_feature(feature_values[feature.name], feature)
+          for feature in features
+      ]
+      if len(columns) == 1 and columns[0].dtype == dtype:
+        # The values are already in the internal format.
+        return jnp.asarray(columns[0])
+
+      return jnp.concatenate(columns, dtype=dtype, axis=1)
 
     return InternalFeatureValues(
         numerical=stack(self.numerical, jnp.float32),
@@ -470,23 +601,49 @@ class NodeIdx:
 
 def _categorical_list_to_bitmap(
     column_spec: ds_pb.Column, items: Sequence[int]
-) -> Sequence[bool]:
+) -> np.ndarray:
   """Converts a list of categorical integer values to a bitmap."""
 
   size = column_spec.categorical.number_of_unique_values
-  bitmap = [False] * size
-  for item in items:
-    if item < 0 or item >= size:
-      raise ValueError(f"Invalid item {item} for column {column_spec!r}")
-    bitmap[item] = True
+  items = np.asarray(items, dtype=np.int64)
+  invalid_items = items[(items < 0) | (items >= size)]
+  if invalid_items.size:
+    raise ValueError(
+        f"Invalid item {invalid_items[0]} for column {column_spec!r}"
+    )
+  bitmap = np.zeros(size, dtype=np.bool_)
+  bitmap[items] = True
   return bitmap
 
 
+@dataclasses.dataclass
+class _BufferIdx:
+  """Index of an item in each of the variable size InternalForest buffers.
+
+  Used both to size the buffers and as a cursor to the next items to write.
+  """
+
+  leaf_node: int = 0
+  non_leaf_node: int = 0
+  catgorical_mask: int = 0
+
+
+# InternalForest buffers filled one tree at a time, and then concatenated.
+_TREE_BUFFER_FIELDS = (
+    "leaf_outputs",
+    "split_features",
+    "split_parameters",
+    "children_pair",
+    "condition_types",
+    "catgorical_mask",
+)
+
+
 @dataclasses.dataclass
 class InternalForest:
   """Internal representation of a forest before being converted to Jax code.
 
-  Several fields (negative_children, positive_children, root_nodes) encode
+  Several fields (children_pair, root_nodes) encode
   collections of node indexes where the sign of the offset indicates if the node
   is a non-leaf node (non strict positive value) or a leaf node (strict negative
   value), and the the absolute value of the offset is relative to the first leaf
@@ -517,10 +674,9 @@ class InternalForest:
       "catgorical_mask[split_parameter + attribute_value]". (3) for oblique
       splits, "split_parameter" an uint32 offset for the first weight and
       attribute in "oblique_weights" and "oblique_attributes" respectively.
-    negative_children: Node offset of the negative children for each non-leaf
-      node in the forest.
-    positive_children: Node offset of the positive children for each non-leaf
-      node in the forest.
+    children_pair: Node offsets of the negative (column 0) and positive (column
+      1) children for each non-leaf node in the forest. Both children are always
+      read together, so they are stored next to each other.
     condition_types: Condition type for each non-leaf nodes in the forest.
     begin_non_leaf_nodes: Index of the first non leaf node for each of the
       trees.
@@ -539,32 +695,29 @@ class InternalForest:
   feature_spec: InternalFeatureSpec = dataclasses.field(init=False)
   feature_encoder: FeatureEncoder = dataclasses.field(init=False)
   dataspec: ds_pb.DataSpecification = dataclasses.field(repr=False, init=False)
-  leaf_outputs: ArrayFloat = dataclasses.field(
-      default_factory=lambda: array.array("f", [])
+  leaf_outputs: np.ndarray = dataclasses.field(
+      default_factory=lambda: np.zeros(0, np.float32)
   )
-  split_features: ArrayInt = dataclasses.field(
-      default_factory=lambda: array.array("l", [])
+  split_features: np.ndarray = dataclasses.field(
+      default_factory=lambda: np.zeros(0, np.int32)
   )
-  split_parameters: ArrayFloat = dataclasses.field(
-      default_factory=lambda: array.array("f", [])
+  split_parameters: np.ndarray = dataclasses.field(
+      default_factory=lambda: np.zeros(0, np.float32)
   )
-  negative_children: ArrayInt = dataclasses.field(
-      default_factory=lambda: array.array("l", [])
+  children_pair: np.ndarray = dataclasses.field(
+      default_factory=lambda: np.zeros((0, 2), np.int32)
   )
-  positive_children: ArrayInt = dataclasses.field(
-      default_factory=lambda: array.array("l", [])
+  condition_types: np.ndarray = dataclasses.field(
+      default_factory=lambda: np.zeros(0, np.int32)
   )
-  condition_types: ArrayInt = dataclasses.field(
-      default_factory=lambda: array.array("l", [])
+  begin_non_leaf_nodes: np.ndarray = dataclasses.field(
+      default_factory=lambda: np.zeros(0, np.int32)
   )
-  begin_non_leaf_nodes: ArrayInt = dataclasses.field(
-      default_factory=lambda: array.array("l", [])
+  begin_leaf_nodes: np.ndarray = dataclasses.field(
+      default_factory=lambda: np.zeros(0, np.int32)
   )
-  begin_leaf_nodes: ArrayInt = dataclasses.field(
-      default_factory=lambda: array.array("l", [])
-  )
-  catgorical_mask: ArrayBool = dataclasses.field(
-      default_factory=lambda: array.array("b", [])
+  catgorical_mask: np.ndarray = dataclasses.field(
+      default_factory=lambda: np.zeros(0, np.bool_)
   )
   oblique_weights: ArrayFloat = dataclasses.field(
       default_factory=lambda: array.array("f", [])
@@ -580,15 +733,14 @@ class InternalForest:
 
   def clear_array_data(self) -> None:
     """Clear all the array data."""
-    self.leaf_outputs = array.array("f", [])
-    self.split_features = array.array("l", [])
-    self.split_parameters = array.array("l", [])
-    self.negative_children = array.array("l", [])
-    self.positive_children = array.array("l", [])
-    self.condition_types = array.array("l", [])
-    self.begin_non_leaf_nodes = array.array("l", [])
-    self.begin_leaf_nodes = array.array("l", [])
-    self.catgorical_mask = array.array("b", [])
+    self.leaf_outputs = np.zeros(0, np.float32)
+    self.split_features = np.zeros(0, np.int32)
+    self.split_parameters = np.zeros(0, np.float32)
+    self.children_pair = np.zeros((0, 2), np.int32)
+    self.condition_types = np.zeros(0, np.int32)
+    self.begin_non_leaf_nodes = np.zeros(0, np.int32)
+    self.begin_leaf_nodes = np.zeros(0, np.int32)
+    self.catgorical_mask = np.zeros(0, np.bool_)
     self.oblique_weights = array.array("f", [])
     self.oblique_attributes = array.array("l", [])
     # Note: We don't release "initial_predictions".
@@ -618,20 +770,89 @@ class InternalForest:
 
     if not isinstance(model, decision_forest_model.DecisionForestModel):
       raise ValueError("The model is not a decision forest")
-    for tree in model.iter_trees():
-      self._add_tree(tree)
+    num_trees = model.num_trees()
+    self.begin_non_leaf_nodes = np.empty(num_trees, np.int32)
+    self.begin_leaf_nodes = np.empty(num_trees, np.int32)
+
+    # Each tree is fetched once from the model and written in its own buffers,
+    # allocated with their final size. The buffers of all the trees are
+    # concatenated at the end. This way, only the Python nodes of a single tree
+    # are alive at any time.
+    #
+    # Note: The empty buffers set by the dataclass fields are used as the first
+    # chunks, so the concatenation works for forests without trees.
+    tree_buffers: Dict[str, List[np.ndarray]] = {
+        name: [getattr(self, name)] for name in _TREE_BUFFER_FIELDS
+    }
+    # Index of the first items of the current tree in the forest buffers.
+    begin = _BufferIdx()
+    for tree_idx, tree in enumerate(model.iter_trees()):
+      self.begin_leaf_nodes[tree_idx] = begin.leaf_node
+      self.begin_non_leaf_nodes[tree_idx] = begin.non_leaf_node
+
+      sizes = _BufferIdx()
+      _count_buffer_items(tree.root, self.dataspec, sizes)
+      self.leaf_outputs = np.empty(sizes.leaf_node, np.float32)
+      self.split_features = np.empty(sizes.non_leaf_node, np.int32)
+      self.split_parameters = np.empty(sizes.non_leaf_node, np.float32)
+      self.children_pair = np.empty((sizes.non_leaf_node, 2), np.int32)
+      self.condition_types = np.empty(sizes.non_leaf_node, np.int32)
+      self.catgorical_mask = np.empty(sizes.catgorical_mask, np.bool_)
+
+      # Index of the next items to write in the tree buffers.
+      cursor = _BufferIdx()
+      self._add_tree(tree, cursor)
+      assert cursor == sizes
+
+      # The "is in" mask offsets are relative to the mask of the tree. Make them
+      # relative to the mask of the forest.
+      is_in_conditions = self.condition_types == ConditionType.IS_IN
+      split_offsets = self.split_parameters.view(np.int32)
+      split_offsets[is_in_conditions] += begin.catgorical_mask
+
+      for name in _TREE_BUFFER_FIELDS:
+        tree_buffers[name].append(getattr(self, name))
+      begin.leaf_node += sizes.leaf_node
+      begin.non_leaf_node += sizes.non_leaf_node
+      begin.catgorical_mask += sizes.catgorical_mask
+
+    for name in _TREE_BUFFER_FIELDS:
+      setattr(self, name, np.concatenate(tree_buffers[name]))
+
+  def _add_tree(self, tree: tree_lib.Tree, cursor: _BufferIdx) -> None:
+    """Adds a tree to the tree buffers.
 
-  def _add_tree(self, tree: tree_lib.Tree) -> None:
-    """Adds a tree to the forest."""
+    Args:
+      tree: Tree to add.
+      cursor: Index of the next items to write. Updated in place.
+    """
 
     begin_node_idx = BeginNodeIdx(
-        leaf_node=self.num_leaf_nodes(),
-        non_leaf_node=self.num_non_leaf_nodes(),
+        leaf_node=cursor.leaf_node,
+        non_leaf_node=cursor.non_leaf_node,
     )
-    self.begin_leaf_nodes.append(begin_node_idx.leaf_node)
-    self.begin_non_leaf_nodes.append(begin_node_idx.non_leaf_node)
 
-    self._add_node(tree.root, begin_node_idx, depth=0)
+    # Depth-first walk with an explicit stack. Each item is a node to add, the
+    # index of its parent non-leaf node (-1 for the root), whether it is the
+    # positive child of its parent, and its depth. The negative child is pushed
+    # last so nodes are indexed in pre-order with the negative child first.
+    stack: List[Tuple[tree_lib.AbstractNode, int, bool, int]] = [
+        (tree.root, -1, False, 0)
+    ]
+    while stack:
+      node, parent_idx, is_pos_child, depth = stack.pop()
+      node_idx = self._add_node(node, cursor, depth)
+
+      # Index the node in its parent.
+      if parent_idx >= 0:
+        self.children_pair[parent_idx, int(is_pos_child)] = node_idx.offset(
+            begin_node_idx
+        )
+
+      if node_idx.non_leaf_node is not None:
+        assert isinstance(node, tree_lib.NonLeaf)
+        stack.append((node.pos_child, node_idx.non_leaf_node, True, depth + 1))
+        stack.append((node.neg_child, node_idx.non_leaf_node, False, depth + 1))
 
   def num_trees(self) -> int:
     """Number of trees in the forest."""
@@ -639,28 +860,39 @@ class InternalForest:
     return len(self.begin_leaf_nodes)
 
   def num_non_leaf_nodes(self) -> int:
-    """Number of non leaf nodes in the forest so far."""
+    """Number of non leaf nodes in the forest."""
 
     n = len(self.split_features)
     # Check data consistency.
     assert n == len(self.split_parameters)
-    assert n == len(self.negative_children)
-    assert n == len(self.positive_children)
+    assert n == len(self.children_pair)
     assert n == len(self.condition_types)
     return n
 
   def num_leaf_nodes(self) -> int:
-    """Number of leaf nodes in the forest so far."""
+    """Number of leaf nodes in the forest."""
 
     return len(self.leaf_outputs)
 
   def _add_node(
       self,
       node: tree_lib.AbstractNode,
-      begin_node_idx: BeginNodeIdx,
+      cursor: _BufferIdx,
       depth: int,
   ) -> NodeIdx:
-    """Adds a node to the forest."""
+    """Adds a node, but not its children, to the forest.
+
+    The children node offsets of a non-leaf node are set by the caller once the
+    children are added.
+
+    Args:
+      node: Node to add.
+      cursor: Index of the next items to write. Updated in place.
+      depth: Depth of the node.
+
+    Returns:
+      Index of the added node.
+    """
 
     if node.is_leaf:  # A leaf node
       # Keep track of the maximum depth
@@ -673,37 +905,36 @@ class InternalForest:
             "The YDF Jax exporter does not support this leaf value:"
             f" {node.value!r}"
         )
-      node_idx = self.num_leaf_nodes()
-      self.leaf_outputs.append(node.value.value)
+      node_idx = cursor.leaf_node
+      cursor.leaf_node += 1
+      self.leaf_outputs[node_idx] = node.value.value
       return NodeIdx(leaf_node=node_idx)
 
     # A non leaf node
     assert isinstance(node, tree_lib.NonLeaf)
-    node_idx = self.num_non_leaf_nodes()
+    node_idx = cursor.non_leaf_node
+    cursor.non_leaf_node += 1
 
     # Set condition
     if isinstance(node.condition, tree_lib.NumericalHigherThanCondition):
       feature_idx = self.feature_spec.inv_numerical[node.condition.attribute]
-      self.split_features.append(feature_idx)
-      self.split_parameters.append(node.condition.threshold)
-      self.condition_types.append(ConditionType.GREATER_THAN)
+      self.split_features[node_idx] = feature_idx
+      self.split_parameters[node_idx] = node.condition.threshold
+      self.condition_types[node_idx] = ConditionType.GREATER_THAN
 
     elif isinstance(node.condition, tree_lib.CategoricalIsInCondition):
       feature_idx = self.feature_spec.inv_categorical[node.condition.attribute]
       column_spec = self.dataspec.columns[node.condition.attribute]
       bitmap = _categorical_list_to_bitmap(column_spec, node.condition.mask)
 
-      offset = len(self.catgorical_mask)
-      float_offset = float(
-          jax.lax.bitcast_convert_type(
-              jnp.array(offset, dtype=jnp.int32), jnp.float32
-          )
-      )
+      offset = cursor.catgorical_mask
+      cursor.catgorical_mask += len(bitmap)
 
-      self.split_features.append(feature_idx)
-      self.split_parameters.append(float_offset)
-      self.condition_types.append(ConditionType.IS_IN)
-      self.catgorical_mask.extend(bitmap)
+      self.split_features[node_idx] = feature_idx
+      # Store the int32 offset bits in the float32 buffer.
+      self.split_parameters.view(np.int32)[node_idx] = offset
+      self.condition_types[node_idx] = ConditionType.IS_IN
+      self.catgorical_mask[offset : offset + len(bitmap)] = bitmap
 
     elif isinstance(node.condition, tree_lib.NumericalSparseObliqueCondition):
       offset = len(self.oblique_weights)
@@ -719,16 +950,10 @@ class InternalForest:
       self.oblique_weights.append(node.condition.threshold)
       self.oblique_attributes.append(0)
 
-      # Encode the offset as a float32
-      float_offset = float(
-          jax.lax.bitcast_convert_type(
-              jnp.array(offset, dtype=jnp.int32), jnp.float32
-          )
-      )
-
-      self.split_features.append(num_weights)
-      self.split_parameters.append(float_offset)
-      self.condition_types.append(ConditionType.SPARSE_OBLIQUE)
+      self.split_features[node_idx] = num_weights
+      # Store the int32 offset bits in the float32 buffer.
+      self.split_parameters.view(np.int32)[node_idx] = offset
+      self.condition_types[node_idx] = ConditionType.SPARSE_OBLIQUE
 
     else:
       # TODO: Add support for other types of conditions.
@@ -737,24 +962,40 @@ class InternalForest:
           f" {node.condition}"
       )
 
-    # Placeholders until the children node indices are computed
-    self.positive_children.append(-1)
-    self.negative_children.append(-1)
+    return NodeIdx(non_leaf_node=node_idx)
 
-    # Populate child nodes
-    neg_child_node = self._add_node(node.neg_child, begin_node_idx, depth + 1)
-    pos_child_node = self._add_node(node.pos_child, begin_node_idx, depth + 1)
 
-    # Index the children
-    self.negative_children[node_idx] = neg_child_node.offset(begin_node_idx)
-    self.positive_children[node_idx] = pos_child_node.offset(begin_node_idx)
+def _count_buffer_items(
+    root: tree_lib.AbstractNode,
+    dataspec: ds_pb.DataSpecification,
+    sizes: _BufferIdx,
+) -> None:
+  """Counts the number of InternalForest buffer items used by a tree.
 
-    return NodeIdx(non_leaf_node=node_idx)
+  Args:
+    root: Root of the tree.
+    dataspec: Dataspec of the model.
+    sizes: Number of items in each of the buffers. Updated in place.
+  """
+
+  stack = [root]
+  while stack:
+    node = stack.pop()
+    if node.is_leaf:
+      sizes.leaf_node += 1
+      continue
+    assert isinstance(node, tree_lib.NonLeaf)
+    sizes.non_leaf_node += 1
+    if isinstance(node.condition, tree_lib.CategoricalIsInCondition):
+      column_spec = dataspec.columns[node.condition.attribute]
+      sizes.catgorical_mask += column_spec.categorical.number_of_unique_values
+    stack.append(node.neg_child)
+    stack.append(node.pos_child)
 
 
 def _densify_conditions(
-    src_conditions: ArrayInt,
-) -> Tuple[Dict[int, int], ArrayInt]:
+    src_conditions: Sequence[int],
+) -> Tuple[Dict[int, int], np.ndarray]:
   """Creates a dense mapping of condition indices.
 
   For instance, if the model only uses conditions 1 and 3, creates the mapping
@@ -768,23 +1009,35 @@ def _densify_conditions(
     Mapping of conditions and result of mapping applied to "conditions".
   """
 
-  unique_conditions: List[int] = sorted(list(set(src_conditions)))  # pytype: disable=annotation-type-mismatch
-  mapping = {old_id: new_id for new_id, old_id in enumerate(unique_conditions)}
-  dst_conditions = [mapping[c] for c in src_conditions]
-  return mapping, array.array("l", dst_conditions)
+  unique_conditions, dst_conditions = np.unique(
+      np.asarray(src_conditions, dtype=np.int32), return_inverse=True
+  )
+  mapping = {
+      int(old_id): new_id for new_id, old_id in enumerate(unique_conditions)
+  }
+  return mapping, dst_conditions.astype(np.int32)
 
 
 @dataclasses.dataclass
 class InternalForestJaxArrays:
-  """Jax arrays for each of the data fields in InternalForest."""
+  """Jax arrays for each of the data fields in InternalForest.
+
+  The leaf values and the "greater than" thresholds are stored with
+  "param_dtype". If "param_dtype" is not float32, the int32 offsets of the "is
+  in" and sparse oblique conditions cannot be bitcast in "split_parameters", and
+  they are stored in "split_offsets" instead.
+  """
 
   forest: dataclasses.InitVar[InternalForest]
   compatibility: Compatibility = dataclasses.field(default=Compatibility.XLA)
+  param_dtype: Any = dataclasses.field(default=jnp.float32)
   leaf_outputs: Optional[jax.Array] = dataclasses.field(init=False)
   split_features: jax.Array = dataclasses.field(init=False)
   split_parameters: jax.Array = dataclasses.field(init=False)
-  negative_children: jax.Array = dataclasses.field(init=False)
-  positive_children: jax.Array = dataclasses.field(init=False)
+  split_offsets: Optional[jax.Array] = dataclasses.field(init=False)
+  # Node offset of the negative (column 0) and positive (column 1) children of
+  # each non-leaf node.
+  children: jax.Array = dataclasses.field(init=False)
   dense_condition_mapping: Dict[int, int] = dataclasses.field(init=False)
   dense_condition_types: Optional[jax.Array] = dataclasses.field(init=False)
   begin_non_leaf_nodes: jax.Array = dataclasses.field(init=False)
@@ -817,12 +1070,28 @@ class InternalForestJaxArrays:
     else:
       raise ValueError(f"Unknown compatibility {self.compatibility!r}")
 
+  def split_offset(self, node_idx):
+    """Gets the int32 offset of an "is in" or sparse oblique condition."""
+    if self.split_offsets is None:
+      return jax.lax.bitcast_convert_type(
+          self.split_parameters[node_idx], jnp.int32
+      )
+    return self.split_offsets[node_idx]
+
   def __post_init__(self, forest: InternalForest):
-    asarray = jax.numpy.asarray
+    asarray = np.asarray
+
+    self.param_dtype = jnp.dtype(self.param_dtype)
+    if not jnp.issubdtype(self.param_dtype, jnp.floating):
+      raise ValueError(
+          "param_dtype should be a floating point dtype. Got"
+          f" {self.param_dtype!r}"
+      )
+    has_float32_params = self.param_dtype == jnp.float32
 
     # Precision to store node offsets
     node_offset_dtype = compact_dtype_on_sequence_sequence(
-        [forest.positive_children, forest.negative_children]
+        [forest.children_pair]
     )
 
     # Precision to store node absolute positions
@@ -830,15 +1099,20 @@ class InternalForestJaxArrays:
         [len(forest.leaf_outputs), len(forest.split_features)]
     )
 
-    self.leaf_outputs = asarray(forest.leaf_outputs, dtype=jnp.float32)
-    self.split_features = to_compact_jax_array(forest.split_features)
-    self.split_parameters = asarray(forest.split_parameters, dtype=jnp.float32)
-    self.negative_children = jnp.array(
-        forest.negative_children, dtype=node_offset_dtype
+    # The arrays are first prepared on the host, and then transferred to the
+    # device all at once.
+    host_arrays: Dict[str, np.ndarray] = {}
+
+    host_arrays["leaf_outputs"] = asarray(
+        forest.leaf_outputs, dtype=self.param_dtype
+    )
+    host_arrays["split_features"] = _to_compact_numpy_array(
+        forest.split_features
     )
-    self.positive_children = jnp.array(
-        forest.positive_children, dtype=node_offset_dtype
+    host_arrays["split_parameters"] = asarray(
+        forest.split_parameters, dtype=self.param_dtype
     )
+    host_arrays["children"] = forest.children_pair.astype(node_offset_dtype)
 
     self.dense_condition_mapping, dense_condition_types = _densify_conditions(
         forest.condition_types
@@ -846,36 +1120,51 @@ class InternalForestJaxArrays:
     if len(self.dense_condition_mapping) == 1:
       self.dense_condition_types = None
     else:
-      self.dense_condition_types = to_compact_jax_array(dense_condition_types)
+      host_arrays["dense_condition_types"] = _to_compact_numpy_array(
+          dense_condition_types
+      )
+
+    if has_float32_params or not (
+        ConditionType.IS_IN in self.dense_condition_mapping
+        or ConditionType.SPARSE_OBLIQUE in self.dense_condition_mapping
+    ):
+      self.split_offsets = None
+    else:
+      host_arrays["split_offsets"] = forest.split_parameters.view(np.int32)
 
-    self.begin_non_leaf_nodes = jnp.array(
+    host_arrays["begin_non_leaf_nodes"] = asarray(
         forest.begin_non_leaf_nodes, dtype=node_idx_dtype
     )
-    self.begin_leaf_nodes = jnp.array(
+    host_arrays["begin_leaf_nodes"] = asarray(
         forest.begin_leaf_nodes, dtype=node_idx_dtype
     )
 
-    if forest.catgorical_mask:
-      self.catgorical_mask = asarray(
-          compress_bitmap(forest.catgorical_mask), dtype=jnp.uint32
-      )
+    if forest.catgorical_mask.size:
+      host_arrays["catgorical_mask"] = compress_bitmap(forest.catgorical_mask)
     else:
       self.catgorical_mask = None
 
     if forest.oblique_weights:
-      self.oblique_weights = asarray(forest.oblique_weights, dtype=jnp.float32)
+      host_arrays["oblique_weights"] = asarray(
+          forest.oblique_weights, dtype=np.float32
+      )
     else:
       self.oblique_weights = None
 
     if forest.oblique_attributes:
-      self.oblique_attributes = to_compact_jax_array(forest.oblique_attributes)
+      host_arrays["oblique_attributes"] = _to_compact_numpy_array(
+          forest.oblique_attributes
+      )
     else:
       self.oblique_attributes = None
 
-    self.initial_predictions = asarray(
-        forest.initial_predictions, dtype=jnp.float32
+    host_arrays["initial_predictions"] = asarray(
+        forest.initial_predictions, dtype=np.float32
     )
 
+    for name, device_array in jax.device_put(host_arrays).items():
+      setattr(self, name, device_array)
+
 
 def to_jax_function(
     model: generic_model.GenericModel,
@@ -883,6 +1172,7 @@ def to_jax_function(
     apply_activation: bool = True,
     leaves_as_params: bool = False,
     compatibility: Union[str, Compatibility] = Compatibility.XLA,
+    param_dtype: Any = jnp.float32,
 ) -> JaxModel:
   """Converts a model into a JAX function.
 
@@ -891,6 +1181,8 @@ def to_jax_function(
     jit: See "to_jax_function" in generic_model.py.
     apply_activation: See "to_jax_function" in generic_model.py.
     leaves_as_params: See "to_jax_function" in generic_model.py.
+    compatibility: See "to_jax_function" in generic_model.py.
+    param_dtype: See "to_jax_function" in generic_model.py.
 
   Returns:
     See "to_jax_function" in generic_model.py.
@@ -929,7 +1221,7 @@ def to_jax_function(
   if isinstance(compatibility, str):
     compatibility = Compatibility[compatibility]
 
-  jax_arrays = InternalForestJaxArrays(forest, compatibility)
+  jax_arrays = InternalForestJaxArrays(forest, compatibility, param_dtype)
   forest.clear_array_data()
 
   if not apply_activation:
@@ -954,6 +1246,7 @@ def to_jax_function(
       _predict_fn,
       forest=forest,
       jax_arrays=jax_arrays,
+      condition_fn=_make_condition_fn(jax_arrays),
   )
 
   if jit:
@@ -971,6 +1264,7 @@ def _predict_fn(
     *,
     forest: InternalForest,
     jax_arrays: InternalForestJaxArrays,
+    condition_fn: ConditionFn,
 ) -> jax.Array:
   """Computes the predictions of the model in Jax.
 
@@ -988,13 +1282,14 @@ def _predict_fn(
     executed.
   - Model dependent optimizations can be applied during the generation of the
     XLA code. For example, if all the conditions have the same type, the
-    condition switch block can be removed from the XLA code.
+    condition selection can be removed from the XLA code.
 
   Args:
     feature_values: Dictionary of input feature values.
     params: Learnable parameters of the model.
     forest: Forest data.
     jax_arrays: JAX array data.
+    condition_fn: Condition evaluation function. See "_make_condition_fn".
 
   Returns:
     Model predictions.
@@ -1003,43 +1298,39 @@ def _predict_fn(
   def predict_one_example(intern_feature_values):
     """Compute model predictions on a single example."""
 
-    def predict_one_example_one_tree(
-        begin_non_leaf_node,
-        begin_leaf_node,
-    ):
-      """Generates the prediction of a single tree on a single example."""
-
-      node_offset_idx = jax.lax.fori_loop(
-          0,
-          forest.max_depth,
-          functools.partial(
-              _route_example_or_wait,
-              begin_non_leaf_node=begin_non_leaf_node,
-              intern_feature_values=intern_feature_values,
-              jax_arrays=jax_arrays,
-          ),
-          jax_arrays.arithmetic_int_dtype(0),
-          unroll=True,
+    # Route the example in all the trees at once i.e. "node_offset_idx" is a
+    # vector with one node offset per tree.
+    #
+    # Note: "max_depth" is known at tracing time. The routing loop is unrolled
+    # by Python instead of being expressed as a "fori_loop".
+    node_offset_idx = jnp.zeros_like(
+        jax_arrays.begin_non_leaf_nodes, dtype=jax_arrays.arithmetic_int_dtype
+    )
+    for _ in range(forest.max_depth):
+      node_offset_idx = _route_example_or_wait(
+          node_offset=node_offset_idx,
+          begin_non_leaf_node=jax_arrays.begin_non_leaf_nodes,
+          intern_feature_values=intern_feature_values,
+          jax_arrays=jax_arrays,
+          condition_fn=condition_fn,
       )
 
-      value_idx = (
-          jax_arrays.arithmetic_int_dtype(begin_leaf_node)
-          - jax_arrays.arithmetic_int_dtype(1)
-          - node_offset_idx
-      )
-      assert value_idx.dtype == jax_arrays.arithmetic_int_dtype
+    value_idx = (
+        jax_arrays.cast_arithmetic_array(jax_arrays.begin_leaf_nodes)
+        - jax_arrays.arithmetic_int_dtype(1)
+        - node_offset_idx
+    )
+    assert value_idx.dtype == jax_arrays.arithmetic_int_dtype
 
-      if jax_arrays.leaf_outputs is None:
-        leaf_outputs = params[_PARAM_LEAF_VALUES]
-      else:
-        leaf_outputs = jax_arrays.leaf_outputs
-      return leaf_outputs[value_idx]
+    if jax_arrays.leaf_outputs is None:
+      leaf_outputs = params[_PARAM_LEAF_VALUES]
+    else:
+      leaf_outputs = jax_arrays.leaf_outputs
 
     # Compute forest prediction.
-    all_predictions = jax.vmap(predict_one_example_one_tree)(
-        jax_arrays.begin_non_leaf_nodes,
-        jax_arrays.begin_leaf_nodes,
-    )
+    # Note: The predictions are accumulated in float32, whatever the storage
+    # dtype of the leaf values.
+    all_predictions = leaf_outputs[value_idx].astype(jnp.float32)
 
     if len(forest.initial_predictions) == 1:
       if jax_arrays.initial_predictions is None:
@@ -1047,9 +1338,7 @@ def _predict_fn(
       else:
         initial_predictions = jax_arrays.initial_predictions
 
-      raw_output = jax.numpy.sum(
-          all_predictions, initial=initial_predictions[0]
-      )
+      raw_output = jax.numpy.sum(all_predictions) + initial_predictions[0]
     else:
       shaped_predictions = jax.numpy.reshape(
           all_predictions, (-1, len(forest.initial_predictions))
@@ -1066,142 +1355,182 @@ def _predict_fn(
       raise ValueError(f"Unsupported activation: {forest.activation!r}")
 
   # Process the feature values for the model consuption.
-  intern_feature_values = dataclasses.asdict(
-      forest.feature_spec.convert_features(feature_values)
-  )
+  intern_feature_values = forest.feature_spec.convert_features(feature_values)
 
   return jax.vmap(predict_one_example)(intern_feature_values)
 
 
-def _route_example(
-    node_offset,
-    begin_non_leaf_node,
-    intern_feature_values: Dict[str, jax.Array],
+def _condition_greater_than(
+    node_idx,
+    intern_feature_values: InternalFeatureValues,
     jax_arrays: InternalForestJaxArrays,
 ):
-  """Returns the routed child node index.
-
-  Args:
-    iter_idx: Iterator index. Not used.
-    begin_non_leaf_node: Index of the root node of the tree.
-    intern_feature_values: Feature values.
-    jax_arrays: JAX array data.
+  """Evaluates a "greater-than" condition."""
+  feature_values = intern_feature_values.numerical
+  feature_value = feature_values[
+      jax_arrays.cast_gather_index(jax_arrays.split_features[node_idx])
+  ]
+  threshold = jax_arrays.split_parameters[node_idx]
+  return feature_value >= threshold.astype(feature_value.dtype)
+
+
+def _condition_is_in(
+    node_idx,
+    intern_feature_values: InternalFeatureValues,
+    jax_arrays: InternalForestJaxArrays,
+):
+  """Evaluates a "is-in" condition."""
+  feature_values = intern_feature_values.categorical
+  feature_value = feature_values[
+      jax_arrays.cast_gather_index(jax_arrays.split_features[node_idx])
+  ]
+  categorical_mask_offset = feature_value + jax_arrays.split_offset(node_idx)
+  return get_bit(jax_arrays.catgorical_mask, categorical_mask_offset)
+
+
+def _condition_sparse_oblique(
+    node_idx,
+    intern_feature_values: InternalFeatureValues,
+    jax_arrays: InternalForestJaxArrays,
+):
+  """Evaluates a sparse oblique condition."""
+  num_weights = jax_arrays.split_features[node_idx]
+  offset = jax_arrays.split_offset(node_idx)
+  bias_offset = offset + jnp.int32(num_weights)
+  bias = jax_arrays.oblique_weights[bias_offset]
+  numerical_features = intern_feature_values.numerical
+
+  def sum_iter(i, a):
+    return (
+        a
+        + numerical_features[jax_arrays.oblique_attributes[i]]
+        * jax_arrays.oblique_weights[i]
+    )
 
-  Returns:
-    Active child node offset.
-  """
+  weighted_sum = jax.lax.fori_loop(offset, bias_offset, sum_iter, -bias)
+  return weighted_sum >= 0.0
 
-  assert node_offset.dtype == jax_arrays.arithmetic_int_dtype
-  node_idx = node_offset + jax_arrays.arithmetic_int_dtype(begin_non_leaf_node)
 
-  # Implementation of the various conditions.
+def _make_condition_fn(jax_arrays: InternalForestJaxArrays) -> ConditionFn:
+  """Creates the function that evaluates the conditions of a forest.
 
-  def condition_greater_than(node_idx):
-    """Evaluates a "greater-than" condition."""
-    feature_values = intern_feature_values["numerical"]
-    feature_value = feature_values[
-        jax_arrays.cast_gather_index(jax_arrays.split_features[node_idx])
-    ]
-    return feature_value >= jax_arrays.split_parameters[node_idx]
+  The function is specialized once, before tracing, on the condition types used
+  by the forest. For example, if all the conditions have the same type, there
+  is no condition selection.
 
-  def condition_is_in(node_idx):
-    """Evaluates a "is-in" condition."""
-    feature_values = intern_feature_values["categorical"]
-    feature_value = feature_values[
-        jax_arrays.cast_gather_index(jax_arrays.split_features[node_idx])
-    ]
-    categorical_mask_offset = feature_value + jax.lax.bitcast_convert_type(
-        jax_arrays.split_parameters[node_idx], jnp.int32
-    )
-    return get_bit(jax_arrays.catgorical_mask, categorical_mask_offset)
-
-  def condition_sparse_oblique(node_idx):
-    """Evaluates a sparse oblique condition."""
-    num_weights = jax_arrays.split_features[node_idx]
-    offset = jax.lax.bitcast_convert_type(
-        jax_arrays.split_parameters[node_idx], jnp.int32
-    )
-    bias_offset = offset + jnp.int32(num_weights)
-    bias = jax_arrays.oblique_weights[bias_offset]
-    numerical_features = intern_feature_values["numerical"]
-
-    def sum_iter(i, a):
-      return (
-          a
-          + numerical_features[jax_arrays.oblique_attributes[i]]
-          * jax_arrays.oblique_weights[i]
-      )
+  Args:
+    jax_arrays: JAX array data.
 
-    weighted_sum = jax.lax.fori_loop(offset, bias_offset, sum_iter, -bias)
-    return weighted_sum >= 0.0
+  Returns:
+    Function that evaluates the condition of the given non-leaf node index in
+    each of the trees.
+  """
 
   # Assemble the condition map.
+  implementations = {
+      ConditionType.GREATER_THAN: _condition_greater_than,
+      ConditionType.IS_IN: _condition_is_in,
+      ConditionType.SPARSE_OBLIQUE: _condition_sparse_oblique,
+  }
   condition_fns = [None] * len(jax_arrays.dense_condition_mapping)
-  if ConditionType.GREATER_THAN in jax_arrays.dense_condition_mapping:
-    condition_fns[
-        jax_arrays.dense_condition_mapping[ConditionType.GREATER_THAN]
-    ] = condition_greater_than
-  if ConditionType.IS_IN in jax_arrays.dense_condition_mapping:
-    condition_fns[jax_arrays.dense_condition_mapping[ConditionType.IS_IN]] = (
-        condition_is_in
+  for condition_type, dense_condition_type in (
+      jax_arrays.dense_condition_mapping.items()
+  ):
+    condition_fn = functools.partial(
+        implementations[condition_type], jax_arrays=jax_arrays
     )
-  if ConditionType.SPARSE_OBLIQUE in jax_arrays.dense_condition_mapping:
-    condition_fns[
-        jax_arrays.dense_condition_mapping[ConditionType.SPARSE_OBLIQUE]
-    ] = condition_sparse_oblique
+    if condition_type == ConditionType.SPARSE_OBLIQUE:
+      # Note: The bounds of the "fori_loop" in a sparse oblique condition must
+      # be scalars. Hence, this condition is vmapped over the trees.
+      condition_fn = jax.vmap(condition_fn, in_axes=(0, None))
+    condition_fns[dense_condition_type] = condition_fn
 
   if len(condition_fns) == 1:
     # Since there is only one type of conditions, there is not need for a
-    # condition switch.
+    # condition selection.
     assert jax_arrays.dense_condition_types is None
-    condition_value = condition_fns[0](node_idx)
-
-  else:
-    # Condition switch on the type of conditions.
-    assert jax_arrays.dense_condition_types is not None
-    condition_value = jax.lax.switch(
-        jax_arrays.dense_condition_types[node_idx],
-        condition_fns,
-        node_idx,
-    )
-
-  return jax_arrays.arithmetic_int_dtype(
-      jax.lax.select(
+    return condition_fns[0]
+
+  assert jax_arrays.dense_condition_types is not None
+
+  def select_condition(node_idx, intern_feature_values: InternalFeatureValues):
+    """Evaluates the condition matching the type of each node."""
+    # Select the condition on the type of conditions. Because of the vmap
+    # operators, a "jax.lax.switch" would evaluate all the branches anyway.
+    # Instead, all the conditions are evaluated and the active one is selected
+    # without control flow.
+    condition_type = jax_arrays.dense_condition_types[node_idx]
+    condition_value = condition_fns[0](node_idx, intern_feature_values)
+    for dense_condition_type in range(1, len(condition_fns)):
+      condition_value = jnp.where(
+          condition_type == dense_condition_type,
+          condition_fns[dense_condition_type](node_idx, intern_feature_values),
           condition_value,
-          jax_arrays.positive_children[node_idx],
-          jax_arrays.negative_children[node_idx],
       )
+    return condition_value
+
+  return select_condition
+
+
+def _route_example(
+    node_offset,
+    begin_non_leaf_node,
+    intern_feature_values: InternalFeatureValues,
+    jax_arrays: InternalForestJaxArrays,
+    condition_fn: ConditionFn,
+):
+  """Returns the routed child node index in each of the trees.
+
+  Args:
+    node_offset: Current node offset for each tree.
+    begin_non_leaf_node: Index of the root node of each tree.
+    intern_feature_values: Feature values.
+    jax_arrays: JAX array data.
+    condition_fn: Condition evaluation function. See "_make_condition_fn".
+
+  Returns:
+    Active child node offset for each tree.
+  """
+
+  assert node_offset.dtype == jax_arrays.arithmetic_int_dtype
+  node_idx = node_offset + jax_arrays.cast_arithmetic_array(begin_non_leaf_node)
+  condition_value = condition_fn(node_idx, intern_feature_values)
+
+  # Gather the active child with the condition value as column index, instead
+  # of reading both children and selecting one.
+  child_column = condition_value.astype(jax_arrays.arithmetic_int_dtype)
+  return jax_arrays.cast_arithmetic_array(
+      jax_arrays.children[node_idx, child_column]
   )
 
 
 def _route_example_or_wait(
-    iter_idx,
     node_offset,
     begin_non_leaf_node,
-    intern_feature_values: Dict[str, jax.Array],
+    intern_feature_values: InternalFeatureValues,
     jax_arrays: InternalForestJaxArrays,
+    condition_fn: ConditionFn,
 ):
-  """Returns the routed child node index.
+  """Returns the routed child node index in each of the trees.
 
   If the node is a leaf, return "node_offset".
 
   Args:
-    iter_idx: Iterator index. Not used.
-    node_offset: Current node offset.
-    begin_non_leaf_node: Index of the root node of the tree.
+    node_offset: Current node offset for each tree.
+    begin_non_leaf_node: Index of the root node of each tree.
     intern_feature_values: Feature values.
     jax_arrays: JAX array data.
+    condition_fn: Condition evaluation function. See "_make_condition_fn".
 
   Returns:
-    Active child node offset.
+    Active child node offset for each tree.
   """
-  del iter_idx
-
   new_node_offset_if_non_leaf = _route_example(
       node_offset=node_offset,
       begin_non_leaf_node=begin_non_leaf_node,
       intern_feature_values=intern_feature_values,
       jax_arrays=jax_arrays,
+      condition_fn=condition_fn,
   )
 
   # Repeats forever the leaf node if we are already in a leaf node.
@@ -1301,9 +1630,11 @@ def compress_bitmap(src_items: Sequence[int]) -> np.ndarray:
     Bitmap array encoded as a sequence of uint32s.
   """
 
+  src_items = np.asarray(src_items, dtype=np.bool_)
   num_output_elements = (len(src_items) + 31) // 32
-  dst_items = np.zeros(num_output_elements, dtype=np.uint32)
-  for idx, value in enumerate(src_items):
-    if value:
-      dst_items[idx // 32] |= 1 << idx % 32
-  return dst_items
+  # Pad the bitmap to a multiple of 32 items, and pack the bits from the least
+  # significant to the most significant.
+  padded_items = np.zeros(num_output_elements * 32, dtype=np.bool_)
+  padded_items[: len(src_items)] = src_items
+  packed_bytes = np.packbits(padded_items, bitorder="little")
+  return packed_bytes.view("<u4").astype(np.uint32)
@@ -1023,6 +1023,7 @@ Use `model.describe()` for more details
       apply_activation: bool = True,
       leaves_as_params: bool = False,
       compatibility: Union[str, "export_jax.Compatibility"] = "XLA",
+      param_dtype: Any = "float32",
   ) -> "export_jax.JaxModel":
     """Converts the YDF model into a JAX function.
 
@@ -1061,6 +1062,11 @@ Use `model.describe()` for more details
         should be passed to `predict(feature_values, params)`.
       compatibility: Constraint on the YDF->JAX conversion to runtime
         compatibility. Can be "XLA" (default), and "TFL" (for TensorFlow Lite).
+      param_dtype: Floating point dtype used to store the leaf values and the
+        condition thresholds, e.g. "float32" (default) or `jnp.bfloat16`. A
+        smaller dtype reduces the memory used by the model, but the rounded
+        thresholds and leaf values can change the predictions. The predictions
+        are always accumulated in float32.
 
     Returns:
       A dataclass containing the JAX prediction function (`predict`) and
@@ -1724,6 +1730,7 @@ class GenericCCModel(GenericModel):
       apply_activation: bool = True,
       leaves_as_params: bool = False,
       compatibility: Union[str, "export_jax.Compatibility"] = "XLA",
+      param_dtype: Any = "float32",
   ) -> "export_jax.JaxModel":
     return _get_export_jax().to_jax_function(
         model=self,
@@ -1731,6 +1738,7 @@ class GenericCCModel(GenericModel):
         apply_activation=apply_activation,
         leaves_as_params=leaves_as_params,
         compatibility=compatibility,
+        param_dtype=param_dtype,
     )
 
   def update_with_jax_params(self, params: Dict[str, Any]):
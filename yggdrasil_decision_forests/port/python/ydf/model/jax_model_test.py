@@ -12,12 +12,11 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-import array
 import logging
 import os
 import sys
 import tempfile
-from typing import Any, Callable, Dict, List, Optional, Sequence
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set
 
 from absl.testing import absltest
 from absl.testing import parameterized
@@ -469,6 +468,51 @@ class JaxModelTest(parameterized.TestCase):
           encoded_features_np[k], encoded_features_py[k]
       )
 
+  @parameterized.parameters(np.str_, np.bytes_)
+  def test_feature_encoder_numpy_strings(self, dtype):
+    feature_encoder = to_jax.FeatureEncoder(
+        categorical={"c1": {"<OOD>": 0, "x": 1, "y": 2, "z": 3}}
+    )
+    encoded_features = feature_encoder.encode(
+        {"c1": np.array(["z", "x", "", "other", "y", "zz"], dtype=dtype)}
+    )
+    np.testing.assert_array_equal(
+        encoded_features["c1"], jnp.asarray([3, 1, -1, 0, 2, 0])
+    )
+    self.assertEqual(encoded_features["c1"].dtype, jnp.int32)
+
+  def test_feature_encoder_numpy_strings_after_mapping_update(self):
+    feature_encoder = to_jax.FeatureEncoder(
+        categorical={"c1": {"<OOD>": 0, "x": 1, "y": 2}}
+    )
+    values = ["x", "y", "z"]
+    np.testing.assert_array_equal(
+        feature_encoder.encode({"c1": np.array(values)})["c1"],
+        jnp.asarray([1, 2, 0]),
+    )
+
+    # Replace the mapping of the feature.
+    feature_encoder.categorical["c1"] = {"<OOD>": 0, "x": 2, "z": 1}
+    np.testing.assert_array_equal(
+        feature_encoder.encode({"c1": np.array(values)})["c1"],
+        feature_encoder.encode({"c1": values})["c1"],
+    )
+    np.testing.assert_array_equal(
+        feature_encoder.encode({"c1": np.array(values)})["c1"],
+        jnp.asarray([2, 0, 1]),
+    )
+
+    # Replace all the mappings.
+    feature_encoder.categorical = {"c1": {"<OOD>": 0, "y": 1}}
+    np.testing.assert_array_equal(
+        feature_encoder.encode({"c1": np.array(values)})["c1"],
+        feature_encoder.encode({"c1": values})["c1"],
+    )
+    np.testing.assert_array_equal(
+        feature_encoder.encode({"c1": np.array(values)})["c1"],
+        jnp.asarray([0, 1, 0]),
+    )
+
   def test_feature_encoder_categorical_is_empty(self):
     columns = ["f1", "i1", "label_class_binary1"]
     model = specialized_learners.RandomForestLearner(
@@ -717,6 +761,61 @@ class InternalFeatureSpecTest(parameterized.TestCase):
         internal_values.boolean, jnp.array([[True, False], [False, True]])
     )
 
+  def test_mapping_convert_single_feature_per_semantic(self):
+    mapping = to_jax.InternalFeatureSpec(
+        [
+            generic_model.InputFeature(
+                "multidim_n1", dataspec_lib.Semantic.NUMERICAL, 0
+            ),
+            generic_model.InputFeature(
+                "c1", dataspec_lib.Semantic.CATEGORICAL, 2
+            ),
+        ],
+        ds_pb.DataSpecification(
+            created_num_rows=2,
+            columns=(
+                ds_pb.Column(
+                    name="multidim_n1.0",
+                    type=ds_pb.ColumnType.NUMERICAL,
+                    is_unstacked=True,
+                ),
+                ds_pb.Column(
+                    name="multidim_n1.1",
+                    type=ds_pb.ColumnType.NUMERICAL,
+                    is_unstacked=True,
+                ),
+                ds_pb.Column(
+                    name="c1",
+                    type=ds_pb.ColumnType.CATEGORICAL,
+                ),
+            ),
+            unstackeds=(
+                ds_pb.Unstacked(
+                    original_name="multidim_n1",
+                    begin_column_idx=0,
+                    size=2,
+                ),
+            ),
+        ),
+    )
+    internal_values = mapping.convert_features({
+        # Already in the internal format.
+        "multidim_n1": jnp.array([[1, 2], [3, 4]], jnp.float32),
+        # Needs a cast.
+        "c1": jnp.array([5, 6], jnp.int8),
+    })
+    np.testing.assert_array_equal(
+        internal_values.numerical,
+        jnp.array([[1.0, 2.0], [3.0, 4.0]], jnp.float32),
+        strict=True,
+    )
+    np.testing.assert_array_equal(
+        internal_values.categorical,
+        jnp.array([[5], [6]], jnp.int32),
+        strict=True,
+    )
+    self.assertEqual(internal_values.boolean.shape, (2, 0))
+
 
 class NodexIdxTest(parameterized.TestCase):
 
@@ -752,14 +851,15 @@ class NodexIdxTest(parameterized.TestCase):
   def test_categorical_list_to_bitmap(
       self, items: Sequence[int], size: int, expected: List[bool]
   ):
-    self.assertEqual(
+    np.testing.assert_array_equal(
         to_jax._categorical_list_to_bitmap(
             ds_pb.Column(
                 categorical=ds_pb.CategoricalSpec(number_of_unique_values=size)
             ),
             items,
         ),
-        expected,
+        np.array(expected, np.bool_),
+        strict=True,
     )
 
 
@@ -803,12 +903,15 @@ class InternalForestTest(parameterized.TestCase):
     self.assertEqual(internal_forest.num_trees(), 2)
     self.assertNotEmpty(internal_forest.feature_encoder.categorical)
 
-    self.assertEqual(
+    np.testing.assert_array_equal(
         internal_forest.leaf_outputs,
-        array.array("f", [5.0, 4.0, 3.0, 2.0, 1.0, 7.0, 6.0]),
+        np.array([5.0, 4.0, 3.0, 2.0, 1.0, 7.0, 6.0], np.float32),
+        strict=True,
     )
-    self.assertEqual(
-        internal_forest.split_features, array.array("l", [0, 0, 0, 0, 1])
+    np.testing.assert_array_equal(
+        internal_forest.split_features,
+        np.array([0, 0, 0, 0, 1], np.int32),
+        strict=True,
     )
 
     def bitcast_uint32_to_float(x):
@@ -818,10 +921,9 @@ class InternalForestTest(parameterized.TestCase):
           )
       )
 
-    self.assertEqual(
+    np.testing.assert_array_equal(
         internal_forest.split_parameters,
-        array.array(
-            "f",
+        np.array(
             [
                 2.0,
                 1.0,
@@ -829,18 +931,21 @@ class InternalForestTest(parameterized.TestCase):
                 bitcast_uint32_to_float(4),
                 1.5,
             ],
+            np.float32,
         ),
+        strict=True,
     )
-    self.assertEqual(
-        internal_forest.negative_children, array.array("l", [1, -1, -3, -4, -1])
-    )
-    self.assertEqual(
-        internal_forest.positive_children, array.array("l", [2, -2, 3, -5, -2])
+    np.testing.assert_array_equal(
+        internal_forest.children_pair,
+        np.array(
+            [[1, 2], [-1, -2], [-3, 3], [-4, -5], [-1, -2]],
+            np.int32,
+        ),
+        strict=True,
     )
-    self.assertEqual(
+    np.testing.assert_array_equal(
         internal_forest.condition_types,
-        array.array(
-            "l",
+        np.array(
             [
                 to_jax.ConditionType.GREATER_THAN,
                 to_jax.ConditionType.GREATER_THAN,
@@ -848,15 +953,26 @@ class InternalForestTest(parameterized.TestCase):
                 to_jax.ConditionType.IS_IN,
                 to_jax.ConditionType.GREATER_THAN,
             ],
+            np.int32,
         ),
+        strict=True,
     )
-    self.assertEqual(
-        internal_forest.begin_non_leaf_nodes, array.array("l", [0, 4])
+    np.testing.assert_array_equal(
+        internal_forest.begin_non_leaf_nodes,
+        np.array([0, 4], np.int32),
+        strict=True,
     )
-    self.assertEqual(internal_forest.begin_leaf_nodes, array.array("l", [0, 5]))
-    self.assertEqual(
+    np.testing.assert_array_equal(
+        internal_forest.begin_leaf_nodes,
+        np.array([0, 5], np.int32),
+        strict=True,
+    )
+    np.testing.assert_array_equal(
         internal_forest.catgorical_mask,
-        array.array("b", [False, True, True, False, False, True, False, False]),
+        np.array(
+            [False, True, True, False, False, True, False, False], np.bool_
+        ),
+        strict=True,
     )
     self.assertEqual(internal_forest.max_depth, 3)
 
@@ -873,6 +989,124 @@ class InternalForestTest(parameterized.TestCase):
     self.assertEqual(internal_forest.num_trees(), 10)
     self.assertNotEmpty(internal_forest.feature_encoder.categorical)
 
+  def test_internal_forest_jax_arrays_bfloat16(self):
+    model = create_toy_model(self)
+    internal_forest = to_jax.InternalForest(model)
+    jax_arrays = to_jax.InternalForestJaxArrays(
+        internal_forest, param_dtype=jnp.bfloat16
+    )
+
+    self.assertEqual(jax_arrays.leaf_outputs.dtype, jnp.bfloat16)
+    self.assertEqual(jax_arrays.split_parameters.dtype, jnp.bfloat16)
+    self.assertEqual(jax_arrays.initial_predictions.dtype, jnp.float32)
+    np.testing.assert_array_equal(
+        jax_arrays.leaf_outputs.astype(jnp.float32),
+        [5.0, 4.0, 3.0, 2.0, 1.0, 7.0, 6.0],
+    )
+    # The "is in" offsets are stored in int32 next to the thresholds.
+    np.testing.assert_array_equal(jax_arrays.split_offsets[2:4], [0, 4])
+    np.testing.assert_array_equal(
+        jax_arrays.split_parameters.astype(jnp.float32)[[0, 1, 4]],
+        [2.0, 1.0, 1.5],
+    )
+
+  def test_to_jax_function_bfloat16_manual(self):
+    # Note: The thresholds and leaf values of the toy model are exactly
+    # representable in bfloat16.
+    model = create_toy_model(self)
+    test_ds = create_dataset(["f1", "c1", "f2", "c2"], 100, seed=1)
+    ydf_predictions = model.predict(test_ds)
+
+    with jax.numpy_dtype_promotion("strict"):
+      jax_model = to_jax.to_jax_function(model, param_dtype=jnp.bfloat16)
+      jax_predictions = jax_model.predict(jax_model.encoder(test_ds))
+
+    np.testing.assert_allclose(
+        jax_predictions,
+        ydf_predictions,
+        rtol=1e-5,
+        atol=1e-5,
+    )
+
+  def test_internal_forest_jax_arrays_float32_has_no_split_offsets(self):
+    model = create_toy_model(self)
+    internal_forest = to_jax.InternalForest(model)
+    jax_arrays = to_jax.InternalForestJaxArrays(internal_forest)
+
+    self.assertEqual(jax_arrays.leaf_outputs.dtype, jnp.float32)
+    self.assertIsNone(jax_arrays.split_offsets)
+
+  def test_internal_forest_jax_arrays_non_float_param_dtype(self):
+    model = create_toy_model(self)
+    internal_forest = to_jax.InternalForest(model)
+    with self.assertRaisesRegex(ValueError, "floating point dtype"):
+      to_jax.InternalForestJaxArrays(internal_forest, param_dtype=jnp.int32)
+
+
+class JaxPredictionTest(parameterized.TestCase):
+  """Compares the predictions of the JAX and YDF models."""
+
+  def check_predictions(
+      self, model: generic_model.GenericModel, test_ds: Dict[str, Any]
+  ):
+    ydf_predictions = model.predict(test_ds)
+    with jax.numpy_dtype_promotion("strict"):
+      jax_model = to_jax.to_jax_function(model)
+      jax_predictions = jax_model.predict(jax_model.encoder(test_ds))
+    np.testing.assert_allclose(
+        jax_predictions,
+        ydf_predictions,
+        rtol=1e-5,
+        atol=1e-5,
+    )
+
+  def test_toy_model(self):
+    model = create_toy_model(self)
+    self.check_predictions(
+        model, create_dataset(["f1", "c1", "f2", "c2"], 100, seed=2)
+    )
+
+  @parameterized.named_parameters(
+      (
+          "greater_than_and_is_in",
+          ["f1", "i1", "c1", "c2"],
+          {},
+          {to_jax.ConditionType.GREATER_THAN, to_jax.ConditionType.IS_IN},
+      ),
+      (
+          "sparse_oblique",
+          ["f1", "f2", "f3", "f4"],
+          {
+              "split_axis": "SPARSE_OBLIQUE",
+              "sparse_oblique_normalization": "STANDARD_DEVIATION",
+          },
+          {to_jax.ConditionType.SPARSE_OBLIQUE},
+      ),
+  )
+  def test_trained_model(
+      self,
+      features: List[str],
+      learner_kwargs: Dict[str, Any],
+      expected_condition_types: Set[to_jax.ConditionType],
+  ):
+    columns = features + ["label_regress1"]
+    model = specialized_learners.GradientBoostedTreesLearner(
+        label="label_regress1",
+        task=generic_learner.Task.REGRESSION,
+        num_trees=10,
+        max_depth=4,
+        validation_ratio=0.0,
+        **learner_kwargs,
+    ).train(create_dataset(columns, 1000, seed=1))
+
+    # Make sure the model contains the tested condition types.
+    internal_forest = to_jax.InternalForest(model)
+    self.assertContainsSubset(
+        expected_condition_types, set(internal_forest.condition_types.tolist())
+    )
+
+    self.check_predictions(model, create_dataset(features, 100, seed=2))
+
 
 @absltest.skip("Broken by JAX v0.4.35")
 class ToJaxTest(parameterized.TestCase):
@@ -887,8 +1121,10 @@ class ToJaxTest(parameterized.TestCase):
   ):
     mapping, dense_conditions = to_jax._densify_conditions(src_conditions)
     self.assertEqual(mapping, expected_mapping)
-    self.assertEqual(
-        dense_conditions, array.array("l", expected_dense_conditions)
+    np.testing.assert_array_equal(
+        dense_conditions,
+        np.array(expected_dense_conditions, np.int32),
+        strict=True,
     )
 
   @parameterized.named_parameters(